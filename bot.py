@@ -4,7 +4,33 @@ import time
 import requests
 import logging
 import html
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+# orjson is much faster; fall back to the stdlib where the wheel isn't available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: lets the activity feed be parsed incrementally instead of all at once
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional, Linux only: reload wallets.json as soon as it is saved
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except (ImportError, OSError):
+    INotify = None
 
 # Load environment variables
 load_dotenv()
@@ -13,39 +39,247 @@ load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHAT_ID = (os.getenv("CHAT_ID") or "").strip()
 POLY_API_KEY = os.getenv("POLY_API_KEY")
+# Seconds between polling cycles; quiet wallets back off up to POLL_MAX_INTERVAL
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL") or 20)
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL") or 600)
+# Trades older than this (seconds) are never notified
+TRADE_MAX_AGE = 3600
+
+# Telegram endpoint and the payload fields shared by every message
+TELEGRAM_SEND_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage" if TELEGRAM_BOT_TOKEN else None
+TELEGRAM_DEFAULTS = {
+    "chat_id": CHAT_ID,
+    "parse_mode": "HTML",
+    "disable_web_page_preview": True
+}
 
 # Wallets File
 WALLETS_FILE = "wallets.json"
+PLACEHOLDER_WALLET = "0xYourWalletAddressHere"
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def json_dumps(obj, indent=False):
+    """
+    Serializes to JSON bytes, compact unless `indent` is set (for hand-edited files).
+    """
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
 
 def load_wallets():
     if os.path.exists(WALLETS_FILE):
         try:
-            with open(WALLETS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(WALLETS_FILE, "rb") as f:
+                return json_loads(f.read())
         except Exception as e:
             logging.error(f"Error loading wallets.json: {e}")
             return {}
     else:
         # Create default file if not exists
-        default_wallets = {"0xYourWalletAddressHere": "Ornek Cuzdan 1"}
+        default_wallets = {PLACEHOLDER_WALLET: "Ornek Cuzdan 1"}
         try:
-            with open(WALLETS_FILE, "w", encoding="utf-8") as f:
-                json.dump(default_wallets, f, indent=4)
+            with open(WALLETS_FILE, "wb") as f:
+                f.write(json_dumps(default_wallets, indent=True))
         except Exception as e:
              logging.error(f"Error creating default wallets.json: {e}")
         return default_wallets
 
+def wallet_items(wallets):
+    """
+    Snapshot of the (address, name) pairs to poll, without the placeholder entry.
+    """
+    return tuple((address, name) for address, name in wallets.items() if address != PLACEHOLDER_WALLET)
+
+def wallets_mtime():
+    try:
+        return os.stat(WALLETS_FILE).st_mtime_ns
+    except OSError:
+        return None
+
 # Load wallets initially
 WALLET_LIST = load_wallets()
+WALLET_ITEMS = wallet_items(WALLET_LIST)
+WALLETS_MTIME = wallets_mtime()
+WALLETS_LOCK = threading.Lock()
+
+def reload_wallets():
+    """
+    Re-reads wallets.json and swaps in the new list; market and state caches are kept.
+    """
+    global WALLET_LIST, WALLET_ITEMS
+    if not os.path.exists(WALLETS_FILE):
+        return
+    wallets = load_wallets()
+    if not isinstance(wallets, dict) or not wallets:
+        logging.warning(f"{WALLETS_FILE} is empty or invalid. Keeping the current wallet list.")
+        return
+    with WALLETS_LOCK:
+        if wallets == WALLET_LIST:
+            return
+        WALLET_LIST = wallets
+        WALLET_ITEMS = wallet_items(wallets)
+    logging.info(f"Reloaded {WALLETS_FILE}: monitoring {len(WALLET_ITEMS)} wallets.")
+
+def reload_wallets_if_modified():
+    # Fallback for platforms without inotify, called once per cycle
+    global WALLETS_MTIME
+    mtime = wallets_mtime()
+    if mtime != WALLETS_MTIME:
+        WALLETS_MTIME = mtime
+        reload_wallets()
+
+def watch_wallets(inotify):
+    # Editors often save via rename, so the directory is watched rather than the file
+    filename = os.path.basename(WALLETS_FILE)
+    while True:
+        try:
+            if any(event.name == filename for event in inotify.read()):
+                reload_wallets()
+        except Exception as e:
+            # main() relies on this thread, so it must outlive a bad reload
+            logging.error(f"Error watching {WALLETS_FILE}: {e}")
+            time.sleep(POLL_INTERVAL) # Wait before retrying
+
+def start_wallets_watcher():
+    """
+    Starts the inotify watcher thread. Returns False if inotify isn't available.
+    """
+    if INotify is None:
+        return False
+    try:
+        inotify = INotify()
+        inotify.add_watch(
+            os.path.dirname(os.path.abspath(WALLETS_FILE)),
+            inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+        )
+    except OSError as e:
+        logging.warning(f"inotify unavailable, polling {WALLETS_FILE} for changes instead: {e}")
+        return False
+    threading.Thread(target=watch_wallets, args=(inotify,), daemon=True).start()
+    return True
 
 # File to store the last processed transaction hash for each wallet
 STATE_FILE = "state.json"
+# Resolved market names survive restarts so a cold start doesn't re-query Gamma
+MARKET_CACHE_FILE = "market_cache.json"
+MARKET_CACHE_TTL = 24 * 3600 # Resolved names
+MARKET_CACHE_NEGATIVE_TTL = 3600 # Asset IDs Gamma did not know
+MARKET_CACHE_ERROR_TTL = 300 # Asset IDs whose lookup failed
+MARKET_CACHE_FLUSH_INTERVAL = 60 # Seconds between rewrites of the cache file
+MARKET_BATCH_SIZE = 50 # Asset IDs per /markets request, keeps the query string short
 API_BASE_URL = "https://data-api.polymarket.com"
 GAMMA_API_URL = "https://gamma-api.polymarket.com"
 
+# Wallets are polled concurrently; requests to Polymarket are paced by the token bucket
+MAX_WORKERS = 8
+
+def make_session(pool_maxsize):
+    """
+    Session with a retrying keep-alive pool per host, so connections are reused across
+    poll cycles. pool_block=True makes callers wait for a pooled connection rather
+    than open throwaway ones.
+    """
+    session = requests.Session()
+    session.headers.update({"User-Agent": "polytakp-bot"})
+    session.mount("https://", HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=pool_maxsize,
+        pool_block=True,
+        # Exponential backoff with jitter for 429/5xx; Retry-After is honoured when sent
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            backoff_max=30,
+            backoff_jitter=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True
+        )
+    ))
+    return session
+
+# data-api and gamma-api are hit by every worker; Telegram only from the output worker.
+# Separate sessions keep the Polymarket API key off Telegram requests.
+POLY_SESSION = make_session(MAX_WORKERS)
+if POLY_API_KEY:
+    POLY_SESSION.headers["Authorization"] = f"Bearer {POLY_API_KEY}"
+TELEGRAM_SESSION = make_session(2)
+
+POLY_RATE_PER_SEC = 4 # data-api
+POLY_BURST = 4
+GAMMA_RATE_PER_SEC = 2 # gamma-api, market name lookups
+GAMMA_BURST = 2
+TELEGRAM_RATE_PER_SEC = 1 # Telegram allows about one message per second per chat
+TELEGRAM_BURST = 1
+POLY_MAX_IN_FLIGHT = 5 # Concurrent Polymarket requests, whatever the worker count
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second, holding at most `burst`.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+POLY_LIMITER = TokenBucket(POLY_RATE_PER_SEC, POLY_BURST)
+GAMMA_LIMITER = TokenBucket(GAMMA_RATE_PER_SEC, GAMMA_BURST)
+TELEGRAM_LIMITER = TokenBucket(TELEGRAM_RATE_PER_SEC, TELEGRAM_BURST)
+POLY_IN_FLIGHT = threading.BoundedSemaphore(POLY_MAX_IN_FLIGHT)
+
+@contextmanager
+def poly_request(limiter):
+    """
+    Wraps a Polymarket request: waits for a token from the host's limiter, then holds
+    one of the in-flight slots until the block (including reading a streamed body) is done.
+    """
+    limiter.acquire()
+    with POLY_IN_FLIGHT:
+        yield
+
+# Guards the module-level caches shared between worker threads
+CACHE_LOCK = threading.Lock()
+
+class LRUDict(OrderedDict):
+    """
+    Dict that evicts its least recently written/touched keys beyond `maxsize` entries.
+    """
+    def __init__(self, maxsize):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+MARKET_CACHE_MAXSIZE = 4096
+WALLET_MARKET_STATE_MAXSIZE = 1000 # Markets remembered per wallet
+
 # Cache for market names to avoid spamming API
-# Asset ID -> Market Title
-MARKET_CACHE = {}
+# Asset ID -> {"name": Market Title (None if not found), "ts": resolve time}
+MARKET_CACHE = LRUDict(MARKET_CACHE_MAXSIZE)
+MARKET_CACHE_DIRTY = False
 
 # Logging Setup
 logging.basicConfig(
@@ -59,62 +293,191 @@ logging.basicConfig(
 def load_state():
     if os.path.exists(STATE_FILE):
         try:
-            with open(STATE_FILE, "r") as f:
-                return json.load(f)
+            with open(STATE_FILE, "rb") as f:
+                return json_loads(f.read())
         except json.JSONDecodeError:
             return {}
     return {}
 
 def save_state(state):
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f, indent=4)
+    # Write to a temp file and swap it in so a crash never leaves a truncated state.json
+    tmp_file = STATE_FILE + ".tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(json_dumps(state))
+        os.replace(tmp_file, STATE_FILE)
+    except OSError as e:
+        logging.error(f"Failed to save {STATE_FILE}: {e}")
+
+def market_entry_is_fresh(entry, now):
+    ttl = entry.get("ttl") or (MARKET_CACHE_TTL if entry.get("name") is not None else MARKET_CACHE_NEGATIVE_TTL)
+    return now - entry.get("ts", 0) < ttl
+
+def load_market_cache():
+    if os.path.exists(MARKET_CACHE_FILE):
+        try:
+            with open(MARKET_CACHE_FILE, "rb") as f:
+                data = json_loads(f.read())
+            if not isinstance(data, dict):
+                return {}
+            # Expired entries would only take LRU slots until their next lookup
+            now = time.time()
+            return {
+                asset_id: entry for asset_id, entry in data.items()
+                if isinstance(entry, dict) and market_entry_is_fresh(entry, now)
+            }
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Ignoring unreadable {MARKET_CACHE_FILE}: {e}")
+    return {}
+
+def save_market_cache():
+    """
+    Writes MARKET_CACHE to disk if it changed since the last save.
+    """
+    global MARKET_CACHE_DIRTY
+    with CACHE_LOCK:
+        if not MARKET_CACHE_DIRTY:
+            return
+        MARKET_CACHE_DIRTY = False
+        # dict() keeps LRU order, orjson would write OrderedDicts in insertion order
+        snapshot = dict(MARKET_CACHE)
+
+    tmp_file = MARKET_CACHE_FILE + ".tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(json_dumps(snapshot))
+        os.replace(tmp_file, MARKET_CACHE_FILE)
+    except OSError as e:
+        logging.warning(f"Failed to write {MARKET_CACHE_FILE}: {e}")
+
+def cache_market_name(asset_id, name, ttl=None):
+    """
+    Stores a lookup result (None for unknown assets); main() flushes it to disk.
+    `ttl` overrides the default lifetime, e.g. for failed lookups.
+    """
+    global MARKET_CACHE_DIRTY
+    entry = {"name": name, "ts": time.time()}
+    if ttl:
+        entry["ttl"] = ttl
+    with CACHE_LOCK:
+        MARKET_CACHE[asset_id] = entry
+        MARKET_CACHE_DIRTY = True
+
+def lookup_market_cache(asset_id):
+    """
+    Returns the cached entry for an Asset ID, or None if missing or expired.
+    """
+    now = time.time()
+    with CACHE_LOCK:
+        entry = MARKET_CACHE.get(asset_id)
+        if entry is None:
+            return None
+        if not market_entry_is_fresh(entry, now):
+            del MARKET_CACHE[asset_id]
+            return None
+        MARKET_CACHE.move_to_end(asset_id)
+        return entry
 
 def send_telegram_message(message):
-    if not TELEGRAM_BOT_TOKEN or not CHAT_ID:
+    if not TELEGRAM_SEND_URL or not CHAT_ID:
         logging.warning("Telegram configuration missing. Skipping notification.")
         return
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": CHAT_ID,
-        "text": message,
-        "parse_mode": "HTML",
-        "disable_web_page_preview": True
-    }
+    payload = {**TELEGRAM_DEFAULTS, "text": message}
     
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        TELEGRAM_LIMITER.acquire()
+        response = TELEGRAM_SESSION.post(TELEGRAM_SEND_URL, json=payload, timeout=10)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"Failed to send Telegram message: {e}")
         if e.response is not None:
              logging.error(f"Telegram Error Details: {e.response.text}")
 
-def get_user_activity(address):
+def take_new_activities(activities, stop_at):
+    """
+    Collects activities until the one with tx hash `stop_at` (already processed) is reached.
+    """
+    new_activities = []
+    for activity in activities:
+        if stop_at and (activity.get("transactionHash") or activity.get("id")) == stop_at:
+            break
+        new_activities.append(activity)
+    return new_activities
+
+def read_activities(response, stop_at):
+    """
+    Parses the activity list from a streamed response. With ijson installed items are
+    decoded one at a time, so nothing past the last processed tx hash is parsed.
+    """
+    if ijson is None:
+        data = json_loads(response.content)
+        return take_new_activities(data if isinstance(data, list) else [], stop_at)
+
+    response.raw.decode_content = True
+    try:
+        return take_new_activities(ijson.items(response.raw, "item", use_float=True), stop_at)
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid activity JSON: {e}") from e
+    except Urllib3Error as e:
+        # Reading response.raw directly bypasses requests' own exception wrapping
+        raise requests.exceptions.ConnectionError(e) from e
+
+# Validators from the last activity response per wallet, for conditional GETs
+# Address -> (ETag, Last-Modified)
+ETAG_CACHE = {}
+# Fallback when the API sends neither validator: digest of the last parsed body
+# Address -> blake2b digest
+BODY_DIGESTS = {}
+
+def get_user_activity(address, stop_at=None, since=None):
+    """
+    Returns activities newer than `stop_at`, or None if the feed is unchanged (HTTP 304).
+    With `since` (unix seconds) the API only returns activities from that time on.
+    """
     url = f"{API_BASE_URL}/activity"
     params = {
         "user": address,
         "limit": 10,
         "type": "TRADE"
     }
+    if since:
+        params["start"] = since
     headers = {}
-    if POLY_API_KEY:
-        headers["Authorization"] = f"Bearer {POLY_API_KEY}"
+    etag, last_modified = ETAG_CACHE.get(address, (None, None))
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
 
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        if response.status_code == 429:
-            logging.warning("Rate limit hit. Sleeping for 5 seconds.")
-            time.sleep(5)
-            # Retry once after sleep? Or just skip to next cycle.
-            # Let's simple return empty list to not crash loop
-            return []
-            
-        response.raise_for_status()
-        data = response.json()
-        return data if isinstance(data, list) else []
-    except requests.exceptions.RequestException as e:
+        with poly_request(POLY_LIMITER), POLY_SESSION.get(url, params=params, headers=headers, timeout=10, stream=True) as response:
+            try:
+                if response.status_code == 304:
+                    return None
+
+                response.raise_for_status()
+                validators = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+                # Without validators, an identical body still means nothing changed.
+                # Only possible when the body is read whole (no ijson streaming).
+                digest = None
+                if not any(validators) and ijson is None:
+                    digest = hashlib.blake2b(response.content, digest_size=16).digest()
+                    if BODY_DIGESTS.get(address) == digest:
+                        return None
+
+                activities = read_activities(response, stop_at)
+                if any(validators):
+                    ETAG_CACHE[address] = validators
+                elif digest:
+                    BODY_DIGESTS[address] = digest
+                return activities
+            finally:
+                # Discard any unread body (304s, errors, the tail ijson skipped) so the
+                # connection goes back to the pool; closing it unread would drop the socket
+                response.raw.drain_conn()
+    except (requests.exceptions.RequestException, ValueError) as e:
         logging.error(f"Error fetching activity for {address}: {e}")
         return []
 
@@ -126,8 +489,9 @@ def resolve_market_name(asset_id):
         return asset_id
         
     # Check cache first
-    if asset_id in MARKET_CACHE:
-        return MARKET_CACHE[asset_id]
+    entry = lookup_market_cache(asset_id)
+    if entry:
+        return entry["name"] or asset_id
         
     # Try Gamma API (markets logic)
     # We query /markets?clobTokenIds=... 
@@ -136,33 +500,112 @@ def resolve_market_name(asset_id):
     params = {"clobTokenIds": asset_id}
     
     try:
-        response = requests.get(url, params=params, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if isinstance(data, list) and len(data) > 0:
-                market = data[0]
-                # Combine question + outcome if needed
-                question = market.get("question", "Unknown Market")
-                MARKET_CACHE[asset_id] = question
-                return question
-    except Exception as e:
+        with poly_request(GAMMA_LIMITER):
+            response = POLY_SESSION.get(url, params=params, timeout=5)
+        response.raise_for_status()
+        data = json_loads(response.content)
+    except (requests.exceptions.RequestException, ValueError) as e:
         logging.warning(f"Failed to resolve market name for {asset_id}: {e}")
-        
+        # Back off briefly instead of retrying this asset on every notification
+        cache_market_name(asset_id, None, ttl=MARKET_CACHE_ERROR_TTL)
+        return asset_id
+
+    if isinstance(data, list) and len(data) > 0:
+        market = data[0]
+        # Combine question + outcome if needed
+        question = market.get("question", "Unknown Market")
+        cache_market_name(asset_id, question)
+        return question
+
+    # Remember misses too so unknown assets aren't re-queried every cycle
+    cache_market_name(asset_id, None)
     return asset_id
 
-def notify_trade(trade, name, address):
-    # Parse Trade Details
-    side = trade.get("side", "UNKNOWN") # BUY / SELL
-    size = trade.get("size", "0")
-    price = trade.get("price", "0")
-    asset = trade.get("asset", "Unknown Asset")
-    
-    # Try to find a readable name for the market/asset
-    # The API returns 'title', 'slug', 'outcome'
-    title = trade.get("title")
-    slug = trade.get("slug")
-    outcome = trade.get("outcome", "")
-    
+def market_token_ids(market):
+    # Gamma returns clobTokenIds as a JSON encoded string, e.g. '["123", "456"]'
+    token_ids = market.get("clobTokenIds") or []
+    if isinstance(token_ids, str):
+        try:
+            token_ids = json_loads(token_ids)
+        except json.JSONDecodeError:
+            return []
+    return token_ids if isinstance(token_ids, list) else []
+
+def fetch_market_names(asset_ids):
+    """
+    Looks up a chunk of Asset IDs with one Gamma API request and caches hits and misses.
+    Returns {asset_id: title} for the IDs that were found.
+    """
+    url = f"{GAMMA_API_URL}/markets"
+    params = [("clobTokenIds", asset_id) for asset_id in asset_ids]
+
+    try:
+        with poly_request(GAMMA_LIMITER):
+            response = POLY_SESSION.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        data = json_loads(response.content)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logging.warning(f"Failed to batch resolve {len(asset_ids)} market names: {e}")
+        for asset_id in asset_ids:
+            cache_market_name(asset_id, None, ttl=MARKET_CACHE_ERROR_TTL)
+        return {}
+
+    names = {}
+    unresolved = set(asset_ids)
+    for market in data if isinstance(data, list) else []:
+        if not isinstance(market, dict):
+            continue
+        question = market.get("question", "Unknown Market")
+        for token_id in market_token_ids(market):
+            if token_id in unresolved:
+                cache_market_name(token_id, question)
+                names[token_id] = question
+                unresolved.discard(token_id)
+
+    for asset_id in unresolved:
+        cache_market_name(asset_id, None)
+    return names
+
+def batch_resolve_market_names(asset_ids):
+    """
+    Resolves Asset IDs to market titles with as few Gamma API requests as possible,
+    fetching only uncached IDs in chunks of MARKET_BATCH_SIZE.
+    Returns {asset_id: title} for every ID that could be resolved.
+    """
+    names = {}
+    missing = []
+    for asset_id in dict.fromkeys(asset_ids):
+        if not asset_id or asset_id == "Unknown Asset":
+            continue
+        entry = lookup_market_cache(asset_id)
+        if entry is None:
+            missing.append(asset_id)
+        elif entry["name"]:
+            names[asset_id] = entry["name"]
+
+    for start in range(0, len(missing), MARKET_BATCH_SIZE):
+        names.update(fetch_market_names(missing[start:start + MARKET_BATCH_SIZE]))
+    return names
+
+# Telegram message layout; every field except action is HTML-escaped by format_trade
+MESSAGE_TEMPLATE = (
+    "👤 <b>Cüzdan:</b> {name}\n"
+    "📝 <b>Eylem:</b> {action}\n"
+    "💰 <b>Miktar:</b> {size} @ {price}\n"
+    "📊 <b>Market:</b> {market} ({outcome})\n"
+    "🔗 <a href='https://polymarket.com/profile/{address}'>Profil Linki</a>"
+)
+
+# Side -> Action (ALDI/SATTI)
+ACTION_MAP = {"BUY": "ALDI 🟢", "SELL": "SATTI 🔴"}
+
+_escape = html.escape
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+def format_trade(side, size, price, asset, title, slug, outcome, name, address):
+    # Fields are extracted once by process_wallet
+    # The API returns 'title', 'slug', 'outcome' to find a readable name for the market/asset
     if title:
         market_display = title
     elif slug:
@@ -173,45 +616,141 @@ def notify_trade(trade, name, address):
     else:
         market_display = asset
     
-    # Determine Action (ALDI/SATTI)
-    # logic: if side == "BUY", it's usually ALDI.
-    if side.upper() == "BUY":
-        action = "ALDI 🟢"
-    elif side.upper() == "SELL":
-        action = "SATTI 🔴"
-    else:
-        action = f"{side} ⚪"
-
-    message = (
-        f"👤 <b>Cüzdan:</b> {html.escape(str(name))}\n"
-        f"📝 <b>Eylem:</b> {action}\n"
-        f"💰 <b>Miktar:</b> {html.escape(str(size))} @ {html.escape(str(price))}\n"
-        f"📊 <b>Market:</b> {html.escape(str(market_display))} ({html.escape(str(outcome))})\n"
-        f"🔗 <a href='https://polymarket.com/profile/{address}'>Profil Linki</a>"
-    )
-    
-    send_telegram_message(message)
-    logging.info(f"Notification sent for {name}: {action} {size} @ {price}")
+    values = {
+        key: _escape(str(value)) for key, value in (
+            ("name", name),
+            ("size", size),
+            ("price", price),
+            ("market", market_display),
+            ("outcome", outcome)
+        )
+    }
+    values["action"] = ACTION_MAP.get(side) or f"{side} ⚪"
+    values["address"] = address
+    return MESSAGE_TEMPLATE.format_map(values)
+
+def chunk_messages(snippets, limit=TELEGRAM_MAX_MESSAGE_LENGTH):
+    """
+    Greedily joins snippets with blank lines into as few messages under `limit` as possible.
+    """
+    messages = []
+    current = ""
+    for snippet in snippets:
+        if current and len(current) + 2 + len(snippet) > limit:
+            messages.append(current)
+            current = snippet
+        else:
+            current = f"{current}\n\n{snippet}" if current else snippet
+    if current:
+        messages.append(current)
+    return messages
+
+def notify_wallet(notifications):
+    """
+    Sends all of one wallet's trades from this cycle as a single Telegram message
+    (split only if it would exceed Telegram's length limit).
+    """
+    try:
+        for message in chunk_messages([format_trade(**n) for n in notifications]):
+            send_telegram_message(message)
+    except Exception as e:
+        # Runs on the output worker, where an exception would otherwise go unseen
+        logging.error(f"Failed to notify for {notifications[0]['name']}: {e}")
+        return
+    for n in notifications:
+        logging.info(f"Notification sent for {n['name']}: {n['side']} {n['size']} @ {n['price']}")
 
 
     
 # Track last action per market to toggle notifications (Buy -> Sell -> Buy)
-# Address -> {Slug: "BUY" or "SELL"}
+# Address -> LRUDict {Slug: "BUY" or "SELL"}, persisted under "positions" in state.json
 WALLET_MARKET_STATE = {}
 
+# Recently processed tx hashes, so a trade is never handled twice even if the
+# last known hash drops out of the activity window. Used as an ordered set.
+# Address -> LRUDict {tx_hash: None}, persisted under "seen" in state.json
+WALLET_SEEN_TX = {}
+WALLET_SEEN_TX_MAXSIZE = 256
+
+def restore_wallet_state(state):
+    """
+    Moves the "positions" and "seen" sections of state.json into their in-memory maps.
+    """
+    positions = state.pop("positions", None)
+    for address, markets in (positions.items() if isinstance(positions, dict) else ()):
+        if isinstance(markets, dict):
+            market_state = LRUDict(WALLET_MARKET_STATE_MAXSIZE)
+            market_state.update(markets)
+            WALLET_MARKET_STATE[address] = market_state
+
+    seen_tx = state.pop("seen", None)
+    for address, tx_hashes in (seen_tx.items() if isinstance(seen_tx, dict) else ()):
+        if isinstance(tx_hashes, list):
+            seen = LRUDict(WALLET_SEEN_TX_MAXSIZE)
+            seen.update(dict.fromkeys(tx_hashes))
+            WALLET_SEEN_TX[address] = seen
+
+def snapshot_state(state):
+    """
+    Copy of state plus the per-wallet maps, safe to serialize on another thread.
+    Must be called between cycles, while no worker is updating them.
+    """
+    snapshot = dict(state)
+    with CACHE_LOCK:
+        snapshot["positions"] = {address: dict(markets) for address, markets in WALLET_MARKET_STATE.items()}
+        snapshot["seen"] = {address: list(seen) for address, seen in WALLET_SEEN_TX.items()}
+    return snapshot
+
+# Adaptive polling, only touched from the main loop
+# Address -> (next due time on the monotonic clock, current delay)
+WALLET_POLL_SCHEDULE = {}
+
+def wallet_is_due(address, now):
+    return WALLET_POLL_SCHEDULE.get(address, (0, 0))[0] <= now
+
+def schedule_next_poll(address, active):
+    """
+    Doubles a quiet wallet's polling delay up to POLL_MAX_INTERVAL; any fresh trade resets it.
+    """
+    _, delay = WALLET_POLL_SCHEDULE.get(address, (0, POLL_INTERVAL))
+    delay = POLL_INTERVAL if active else min(delay * 2, POLL_MAX_INTERVAL)
+    WALLET_POLL_SCHEDULE[address] = (time.monotonic() + delay, delay)
+
 def process_wallet(address, name, last_tx_hash):
-    activities = get_user_activity(address)
+    """
+    Returns the newest processed tx hash and the notifications to send for this wallet.
+    """
+    logging.info(f"Checking {name} ({address})...")
+    # Activities older than this are never notified (1 Hour Limit)
+    cutoff = int(time.time()) - TRADE_MAX_AGE
+
+    # stop_at cuts the fetch at last_tx_hash, so only newer activities come back;
+    # None means nothing changed. The seen set below catches reordered feeds and
+    # feeds where the pointer has dropped out of the window. Once a baseline exists,
+    # stale trades are filtered out by the server too. The first run still needs
+    # the latest trade, however old, to sync to.
+    activities = get_user_activity(
+        address,
+        stop_at=last_tx_hash,
+        since=cutoff if last_tx_hash else None
+    )
     if not activities:
-        return last_tx_hash
+        return last_tx_hash, []
 
-    # Init state dict for wallet if not exists
-    if address not in WALLET_MARKET_STATE:
-        WALLET_MARKET_STATE[address] = {}
+    # Init state dicts for wallet if not exists
+    with CACHE_LOCK:
+        if address not in WALLET_MARKET_STATE:
+            WALLET_MARKET_STATE[address] = LRUDict(WALLET_MARKET_STATE_MAXSIZE)
+        if address not in WALLET_SEEN_TX:
+            WALLET_SEEN_TX[address] = LRUDict(WALLET_SEEN_TX_MAXSIZE)
+    seen = WALLET_SEEN_TX[address]
 
     newest_hash_in_batch = last_tx_hash
     new_trades = []
+    notifications = []
     
-    current_time = time.time()
+    top_tx_hash = None
+    batch_tx_hashes = []
     
     for activity in activities:
         tx_hash = activity.get("transactionHash") or activity.get("id")
@@ -219,41 +758,49 @@ def process_wallet(address, name, last_tx_hash):
         if not tx_hash:
             continue
             
-        if tx_hash == last_tx_hash:
-            break
+        if top_tx_hash is None:
+            top_tx_hash = tx_hash
+            
+        # Already handled in an earlier cycle (e.g. the feed was reordered)
+        if tx_hash in seen:
+            continue
+        batch_tx_hashes.append(tx_hash)
             
         # STRICT TIMESTAMP CHECK
-        activity_timestamp = activity.get("timestamp")
-        is_fresh = False
-        
-        if activity_timestamp:
-            try:
-                ts = float(activity_timestamp)
-                if ts > 1000000000000: ts = ts / 1000 # ms to s
-                if current_time - ts <= 3600: # 1 Hour Limit
-                    is_fresh = True
-            except:
-                pass
+        # Polymarket sends integer seconds (or ms); missing/broken counts as stale
+        try:
+            ts = int(activity.get("timestamp") or 0)
+        except (TypeError, ValueError):
+            ts = 0
+        if ts > 1_000_000_000_000: ts //= 1000 # ms to s
         
         # If timestamp is missing/broken, we skip strictly to avoid old spam
         # unless it's genuinely new activity? Safest to rely on timestamp.
-        if is_fresh:
-            new_trades.append(activity)
+        if ts >= cutoff:
+            new_trades.append((tx_hash, activity))
+            
+    # Oldest first, so the newest hashes are the last to be evicted
+    for tx_hash in reversed(batch_tx_hashes):
+        seen[tx_hash] = None
             
     # If first run (last_tx_hash is None), just sync, NO notify.
     if last_tx_hash is None:
-        if activities:
-             top_activity = activities[0]
+        if top_tx_hash:
              logging.info(f"First run for {name}. Syncing state to latest transaction.")
-             return top_activity.get("transactionHash") or top_activity.get("id")
-        return None
+        return top_tx_hash, []
 
     # Process new trades (Oldest to Newest)
     if new_trades:
-        for trade in reversed(new_trades):
+        market_state = WALLET_MARKET_STATE[address]
+        for tx_hash, trade in reversed(new_trades):
+            # Parse Trade Details
+            side = (trade.get("side") or "UNKNOWN").upper() # BUY / SELL
+            asset = trade.get("asset")
+            title = trade.get("title")
+            slug = trade.get("slug")
+            
             # Key for deduplication: Market Slug (Question) preferred
-            slug = trade.get("slug") or trade.get("asset") or "unknown_market"
-            side = trade.get("side", "").upper()
+            market_key = slug or asset or "unknown_market"
             
             # STATE MACHINE NOTIFICATION LOGIC
             # Only notify if the action (Side) is DIFFERENT from the last known action for this market.
@@ -263,22 +810,33 @@ def process_wallet(address, name, last_tx_hash):
             # Sell -> Buy (Notify) - User re-entering
             # First time (None) -> Buy/Sell (Notify)
             
-            last_side = WALLET_MARKET_STATE[address].get(slug)
+            last_side = market_state.get(market_key)
             
             should_notify = False
             if side != last_side:
                 should_notify = True
-                WALLET_MARKET_STATE[address][slug] = side
+                market_state[market_key] = side
             else:
-                logging.info(f"Suppressing duplicate {side} for {name} on {slug}")
+                logging.info(f"Suppressing duplicate {side} for {name} on {market_key}")
 
             if should_notify:
-                notify_trade(trade, name, address)
+                # Sent by main() once market names for the whole cycle are resolved
+                notifications.append({
+                    "side": side,
+                    "size": trade.get("size", "0"),
+                    "price": trade.get("price", "0"),
+                    "asset": asset or "Unknown Asset",
+                    "title": title,
+                    "slug": slug,
+                    "outcome": trade.get("outcome", ""),
+                    "name": name,
+                    "address": address
+                })
                 
             # Update pointer
-            newest_hash_in_batch = trade.get("transactionHash") or trade.get("id")
+            newest_hash_in_batch = tx_hash
 
-    return newest_hash_in_batch
+    return newest_hash_in_batch, notifications
 
 def main():
     logging.info("Polymarket Bot Started...")
@@ -292,36 +850,95 @@ def main():
         logging.warning("⚠️ CHAT_ID is missing in .env file! Notifications will NOT be sent.")
         logging.warning("Please run 'python get_chat_id.py' to find your Chat ID.")
 
+    if PLACEHOLDER_WALLET in WALLET_LIST:
+        logging.warning(f"⚠️ Monitor list contains '{PLACEHOLDER_WALLET}'. Please edit {WALLETS_FILE}!")
+
     state = load_state()
+    # Restoring the last side per market avoids re-notifying held positions after a restart
+    restore_wallet_state(state)
+    MARKET_CACHE.update(load_market_cache())
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    # Single thread for Telegram sends and state.json / market_cache.json writes:
+    # keeps them ordered and off the polling loop
+    output_worker = ThreadPoolExecutor(max_workers=1)
+    last_cache_flush = time.monotonic()
+    completed_state = None
+    watching_wallets = start_wallets_watcher()
     
     while True:
         try:
-            for address, name in WALLET_LIST.items():
-                if address == "0xYourWalletAddressHere":
-                    logging.warning("⚠️ Monitor list contains '0xYourWalletAddressHere'. Please edit WALLET_LIST in bot.py!")
+            if not watching_wallets:
+                reload_wallets_if_modified()
+
+            # Poll all due wallets concurrently; state is only touched from this thread
+            now = time.monotonic()
+            futures = {
+                executor.submit(process_wallet, address, name, state.get(address)): (address, name)
+                for address, name in WALLET_ITEMS
+                if wallet_is_due(address, now)
+            }
+
+            # One list of notifications per wallet that has any
+            pending = []
+            for future in as_completed(futures):
+                address, name = futures[future]
+                try:
+                    new_last_tx, wallet_notifications = future.result()
+                except Exception as e:
+                    # A failing wallet must not abort the rest of the cycle
+                    logging.error(f"Error processing {name} ({address}): {e}")
                     continue
-                    
-                logging.info(f"Checking {name} ({address})...")
-                
-                last_tx = state.get(address)
-                new_last_tx = process_wallet(address, name, last_tx)
-                
-                if new_last_tx and new_last_tx != last_tx:
+                # The pointer only moves when fresh trades came in
+                schedule_next_poll(address, new_last_tx != state.get(address))
+                if wallet_notifications:
+                    pending.append(wallet_notifications)
+                if new_last_tx:
                     state[address] = new_last_tx
-                    save_state(state)
-                    
-                # Short sleep between wallets to be nice to API
-                time.sleep(2)
+
+            # One Gamma request for every market that needs a name this cycle.
+            # State has already moved on, so a failure here must not drop the
+            # notifications; format_trade falls back to per-asset lookups.
+            try:
+                batch_resolve_market_names([
+                    n["asset"] for wallet_notifications in pending for n in wallet_notifications
+                    if not n["title"] and not n["slug"]
+                ])
+            except Exception as e:
+                logging.error(f"Failed to batch resolve market names: {e}")
+            # Sent in order by the output worker, so the loop never waits on Telegram
+            for wallet_notifications in pending:
+                output_worker.submit(notify_wallet, wallet_notifications)
+
+            # Notifications are the only durable side effect, so state is persisted
+            # (once per cycle) only after one went out; the output worker runs the
+            # write after this cycle's sends. Baselines and suppressed trades are
+            # kept in memory and ride along with the next write, or with the
+            # final flush of the last completed cycle on shutdown.
+            completed_state = snapshot_state(state)
+            if pending:
+                output_worker.submit(save_state, completed_state)
+
+            # Debounced: new market names reach disk at most once a minute
+            if time.monotonic() - last_cache_flush >= MARKET_CACHE_FLUSH_INTERVAL:
+                output_worker.submit(save_market_cache)
+                last_cache_flush = time.monotonic()
                 
-            logging.info("Cycle complete. Waiting 60s...")
-            time.sleep(20)
+            logging.info(f"Cycle complete ({len(futures)}/{len(WALLET_ITEMS)} wallets due). Waiting {POLL_INTERVAL:g}s...")
+            time.sleep(POLL_INTERVAL)
             
         except KeyboardInterrupt:
             logging.info("Bot stopped by user.")
             break
         except Exception as e:
             logging.error(f"Unexpected error in main loop: {e}")
-            time.sleep(20) # Wait before retrying
+            time.sleep(POLL_INTERVAL) # Wait before retrying
+
+    executor.shutdown(wait=False, cancel_futures=True)
+    output_worker.shutdown(wait=True)
+    # A cycle interrupted half way is not saved: its notifications were never sent
+    if completed_state is not None:
+        save_state(completed_state)
+    save_market_cache()
 
 if __name__ == "__main__":
     main()